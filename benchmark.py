@@ -0,0 +1,210 @@
+import argparse
+import importlib.util
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+
+# ---------------------------------------------------------
+# LOAD THE VIEWER MODULE (file name is not importable)
+# ---------------------------------------------------------
+HERE = os.path.dirname(os.path.abspath(__file__))
+_spec = importlib.util.spec_from_file_location(
+    "rtsp_viewer",
+    os.path.join(HERE, "rtsp-viewer.py")
+)
+viewer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(viewer)
+
+
+# ---------------------------------------------------------
+# HELPERS
+# ---------------------------------------------------------
+def make_renderer(maintain_aspect=False):
+    # frame_to_image only needs the aspect flag, not a Tk window
+    renderer = viewer.RTSPViewer.__new__(viewer.RTSPViewer)
+    renderer.maintain_aspect = maintain_aspect
+    return renderer
+
+
+def iter_frames(clip, limit):
+    # Decode as we go: holding hundreds of full-res frames won't fit on a Pi
+    cap = cv2.VideoCapture(clip)
+
+    for _ in range(limit):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+
+    cap.release()
+
+
+def summarize(label, samples):
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<28} frames={len(ms):<5} "
+        f"mean={statistics.mean(ms):7.2f}ms "
+        f"p95={p95:7.2f}ms "
+        f"fps={1000 / statistics.mean(ms):7.1f}"
+    )
+
+
+# ---------------------------------------------------------
+# SNAPSHOT BENCHMARK
+# ---------------------------------------------------------
+def bench_snapshot(args):
+    renderer = make_renderer(args.aspect)
+    w, h = args.size
+
+    # Baseline: the worker's per-frame render path (decode not timed)
+    baseline = []
+    for frame in iter_frames(args.clip, args.frames):
+        start = time.perf_counter()
+        renderer.frame_to_image(frame, w, h)
+        baseline.append(time.perf_counter() - start)
+
+    if not baseline:
+        print(f"No frames decoded from {args.clip}")
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = viewer.SnapshotWriter(
+            directory=args.output or tmp,
+            fmt=args.format,
+            quality=args.quality,
+            workers=args.workers,
+            max_pending=args.max_pending
+        )
+
+        # Same path with snapshots submitted while frames render
+        loaded = []
+        wall = time.perf_counter()
+        for i, frame in enumerate(iter_frames(args.clip, args.frames)):
+            start = time.perf_counter()
+            if i % max(1, args.every) == 0:
+                writer.submit(frame, "bench", time.time())
+            renderer.frame_to_image(frame, w, h)
+            loaded.append(time.perf_counter() - start)
+
+        writer.shutdown(wait=True)
+        wall = time.perf_counter() - wall
+
+    summarize("render", baseline)
+    summarize("render + snapshots", loaded)
+
+    added = statistics.mean(loaded) - statistics.mean(baseline)
+    print(f"added per-frame latency     {added * 1000:+.2f}ms")
+    print(
+        f"snapshots written={writer.written} dropped={writer.dropped} "
+        f"failed={writer.failed} "
+        f"throughput={writer.written / wall:.1f}/s"
+    )
+
+
+# ---------------------------------------------------------
+# DECODE BACKEND BENCHMARK
+# ---------------------------------------------------------
+def run_backend(clip, feed, renderer, size, limit):
+    cap = viewer.open_capture(clip, feed)
+    if not cap.isOpened():
+        return None
+
+    w, h = size
+    decode, convert = [], []
+    wall = time.perf_counter()
+
+    while len(decode) < limit:
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        mid = time.perf_counter()
+        renderer.frame_to_image(frame, w, h)
+        decode.append(mid - start)
+        convert.append(time.perf_counter() - mid)
+
+    wall = time.perf_counter() - wall
+    cap.release()
+    return decode, convert, wall
+
+
+def bench_decode(args):
+    renderer = make_renderer(args.aspect)
+
+    backends = [("opencv", {})]
+    if viewer.av is None:
+        print("PyAV not installed, benchmarking OpenCV only")
+    else:
+        backends.append((
+            f"pyav threads={args.threads} skip={args.skip_frame}",
+            {
+                "backend": "pyav",
+                "decoder": {
+                    "threads": args.threads,
+                    "thread_type": args.thread_type,
+                    "skip_frame": args.skip_frame,
+                },
+            },
+        ))
+
+    for clip in args.clips:
+        print(clip)
+
+        for label, feed in backends:
+            result = run_backend(clip, feed, renderer, args.size, args.frames)
+            if result is None or not result[0]:
+                print(f"  {label}: could not decode")
+                continue
+
+            decode, convert, wall = result
+            print(f"  {label}")
+            summarize("    decode", decode)
+            summarize("    convert + resize", convert)
+            print(f"    end-to-end fps={len(decode) / wall:.1f}")
+
+
+# ---------------------------------------------------------
+# ENTRY POINT
+# ---------------------------------------------------------
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rtsp-viewer benchmarks on local clips")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="snapshot throughput and per-frame cost")
+    snap.add_argument("clip")
+    snap.add_argument("--frames", type=int, default=300)
+    snap.add_argument("--size", type=parse_size, default=(640, 360))
+    snap.add_argument("--aspect", action="store_true")
+    snap.add_argument("--every", type=int, default=1, help="snapshot every N frames")
+    snap.add_argument("--format", default="jpg")
+    snap.add_argument("--quality", type=int, default=90)
+    snap.add_argument("--workers", type=int, default=2)
+    snap.add_argument("--max-pending", type=int, default=8)
+    snap.add_argument("--output", help="keep snapshots here instead of a temp dir")
+    snap.set_defaults(func=bench_snapshot)
+
+    dec = sub.add_parser("decode", help="OpenCV vs PyAV decode and render cost")
+    dec.add_argument("clips", nargs="+")
+    dec.add_argument("--frames", type=int, default=300)
+    dec.add_argument("--size", type=parse_size, default=(640, 360))
+    dec.add_argument("--aspect", action="store_true")
+    dec.add_argument("--threads", type=int, default=0, help="0 lets FFmpeg pick")
+    dec.add_argument("--thread-type", default="AUTO")
+    dec.add_argument("--skip-frame", default="DEFAULT")
+    dec.set_defaults(func=bench_decode)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
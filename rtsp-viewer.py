@@ -7,6 +7,15 @@ import threading
 import time
 import os
 import queue
+import re
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+# PyAV is optional: only needed for feeds with "backend": "pyav"
+try:
+    import av
+except ImportError:
+    av = None
 
 # ---------------------------------------------------------
 # RTSP / FFMPEG SETTINGS
@@ -17,6 +26,380 @@ os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = (
 )
 
 
+class PyAVCapture:
+    # ---------------------------------------------------------
+    # PYAV DECODE BACKEND (cv2.VideoCapture-compatible)
+    # ---------------------------------------------------------
+    # Gives control over codec threading and skip_frame, and returns
+    # av.VideoFrame objects so rendering can let libswscale scale and
+    # convert straight to rgb24. grab() blocks until a frame decodes,
+    # so the viewer only calls it from a ThreadedCapture reader.
+    MAX_INVALID_PACKETS = 50
+
+    def __init__(self, url, threads=0, thread_type="AUTO",
+                 skip_frame="DEFAULT"):
+        self.container = None
+        self.stream = None
+        self.packets = None
+        self.decoded = []
+        self.frame = None
+
+        options = {"fflags": "nobuffer"}
+        if url.startswith("rtsp"):
+            options["rtsp_transport"] = "tcp"
+
+        try:
+            self.container = av.open(url, options=options, timeout=10)
+            self.stream = self.container.streams.video[0]
+
+            ctx = self.stream.codec_context
+            ctx.thread_count = threads
+            ctx.thread_type = thread_type
+            ctx.skip_frame = skip_frame
+
+            self.packets = self.container.demux(self.stream)
+        except Exception as e:
+            print(f"PyAV failed to open {url}: {e}")
+            self.release()
+
+    def isOpened(self):
+        return self.packets is not None
+
+    def grab(self):
+        self.frame = None
+        invalid = 0
+
+        while self.packets is not None:
+            if self.decoded:
+                self.frame = self.decoded.pop(0)
+                return True
+
+            # Give up on a stream that sends nothing but garbage
+            if invalid >= self.MAX_INVALID_PACKETS:
+                print(f"PyAV: {invalid} invalid packets in a row, reconnecting")
+                return False
+
+            try:
+                packet = next(self.packets)
+            except av.error.InvalidDataError:
+                # A failed demux ends its generator, so start a new one
+                invalid += 1
+                self.packets = self.container.demux(self.stream)
+                continue
+            except (StopIteration, EOFError, OSError, av.error.FFmpegError):
+                # EOF, network errors and the open timeout end the session
+                return False
+
+            try:
+                self.decoded = packet.decode()
+                invalid = 0
+            except av.error.InvalidDataError:
+                # One corrupt packet is not the end of the stream
+                invalid += 1
+            except (EOFError, OSError, av.error.FFmpegError):
+                return False
+
+        return False
+
+    def retrieve(self):
+        return self.frame is not None, self.frame
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+        self.container = None
+        self.packets = None
+        self.decoded = []
+
+
+def open_capture(url, feed=None):
+    feed = feed or {}
+
+    if feed.get("backend") == "pyav":
+        if av is not None:
+            decoder = feed.get("decoder", {})
+            return PyAVCapture(
+                url,
+                threads=decoder.get("threads", 0),
+                thread_type=decoder.get("thread_type", "AUTO"),
+                skip_frame=decoder.get("skip_frame", "DEFAULT")
+            )
+        print(f"PyAV not installed, using OpenCV for {url}")
+
+    cap = cv2.VideoCapture(url)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+class ThreadedCapture:
+    # ---------------------------------------------------------
+    # BACKGROUND READER (ONE THREAD PER STREAM)
+    # ---------------------------------------------------------
+    # Connects, decodes and reconnects on its own thread and keeps only
+    # the newest frame, so a slow or stalled stream never blocks the
+    # video worker. When setup_slots is given, each connection attempt
+    # holds a slot only until its first frame arrives. In background
+    # mode frames are only grabbed (decoded, not colour converted)
+    # until detach() puts the stream on screen.
+    def __init__(self, opener, url, setup_slots=None, background=False):
+        self.opener = opener
+        self.url = url
+        self.setup_slots = setup_slots
+        self.background = background
+
+        self.lock = threading.Lock()
+        self.held = False
+        self.frame = None
+        self.stamp = None
+        self.fresh = False
+        self.connected = False
+        self.stop = threading.Event()
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def isOpened(self):
+        return not self.stop.is_set()
+
+    def next_frame(self):
+        # (frame, capture time) if not handed out yet, else (None, None)
+        with self.lock:
+            if not self.fresh:
+                return None, None
+            self.fresh = False
+            return self.frame, self.stamp
+
+    def latest_frame(self):
+        with self.lock:
+            return self.frame, self.stamp
+
+    def detach(self):
+        # On screen now: full reads, and no more waiting on setup slots
+        with self.lock:
+            slots = self.setup_slots if self.held else None
+            self.setup_slots = None
+            self.held = False
+            self.background = False
+
+        if slots is not None:
+            slots.release()
+
+    def release(self):
+        # The reader thread closes the stream once its current read returns
+        self.stop.set()
+
+    def _acquire_slot(self):
+        while not self.stop.is_set():
+            with self.lock:
+                slots = self.setup_slots
+            if slots is None:
+                return
+
+            if slots.acquire(timeout=0.25):
+                with self.lock:
+                    if self.setup_slots is slots:
+                        self.held = True
+                        return
+                # Detached while waiting
+                slots.release()
+                return
+
+    def _release_slot(self):
+        with self.lock:
+            slots = self.setup_slots if self.held else None
+            self.held = False
+
+        if slots is not None:
+            slots.release()
+
+    def _run(self):
+        while not self.stop.is_set():
+            self._acquire_slot()
+            if self.stop.is_set():
+                self._release_slot()
+                return
+
+            try:
+                cap = self.opener(self.url)
+                grabbed = False
+
+                while not self.stop.is_set():
+                    with self.lock:
+                        background = self.background
+
+                    try:
+                        if background:
+                            ret, frame = cap.grab(), None
+                            grabbed = ret
+                        elif grabbed:
+                            # Publish the frame decoded in the background
+                            grabbed = False
+                            ret, frame = cap.retrieve()
+                            if not ret:
+                                continue
+                        else:
+                            ret, frame = cap.read()
+                    except Exception as e:
+                        print(f"Read failed on {self.url}: {e}")
+                        ret = False
+                    if not ret:
+                        break
+
+                    with self.lock:
+                        self.connected = True
+                        if frame is not None:
+                            self.frame = frame
+                            self.stamp = time.time()
+                            self.fresh = True
+
+                    self._release_slot()
+
+                cap.release()
+            finally:
+                self._release_slot()
+
+            with self.lock:
+                self.frame = None
+                self.stamp = None
+                self.fresh = False
+                self.connected = False
+
+            # Back off before reconnecting a dropped stream
+            self.stop.wait(1.0)
+
+
+class StreamPrefetcher:
+    # ---------------------------------------------------------
+    # BACKGROUND PRE-CONNECT FOR UPCOMING FEEDS
+    # ---------------------------------------------------------
+    # Each prefetched url gets a background ThreadedCapture that
+    # connects and keeps grabbing, so it is already past a keyframe
+    # when the video worker claims it. The semaphore caps how many of
+    # them may be in a connection handshake at once; it does not cap
+    # the number of warm streams.
+    def __init__(self, opener, max_connections=2):
+        self.opener = opener
+        self.slots = threading.BoundedSemaphore(max(1, max_connections))
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def prefetch(self, urls):
+        with self.lock:
+            for url in list(self.entries):
+                if url not in urls:
+                    self.entries.pop(url).release()
+
+            for url in urls:
+                if url and url not in self.entries:
+                    self.entries[url] = ThreadedCapture(
+                        self.opener,
+                        url,
+                        setup_slots=self.slots,
+                        background=True
+                    )
+
+    def claim(self, url):
+        # Hand the capture over to the caller, or None if not prefetched
+        with self.lock:
+            cap = self.entries.pop(url, None)
+
+        if cap is not None:
+            cap.detach()
+        return cap
+
+    def stop_all(self):
+        self.prefetch([])
+
+
+class SnapshotWriter:
+    # ---------------------------------------------------------
+    # FULL-RESOLUTION SNAPSHOTS (OFF THE VIDEO WORKER)
+    # ---------------------------------------------------------
+    # Encoding and disk writes run on a small thread pool. Requests
+    # beyond max_pending are dropped instead of queueing up behind a
+    # slow disk.
+    FORMATS = ("jpg", "jpeg", "png")
+
+    def __init__(self, directory="snapshots", fmt="jpg", quality=90,
+                 workers=2, max_pending=8):
+        self.directory = directory
+        self.fmt = fmt.lower().lstrip(".")
+        self.max_pending = max(1, max_pending)
+
+        if self.fmt not in self.FORMATS:
+            print(f"Unsupported snapshot format '{fmt}', using jpg")
+            self.fmt = "jpg"
+
+        if self.fmt == "png":
+            self.params = [cv2.IMWRITE_PNG_COMPRESSION, 3]
+        else:
+            self.params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+
+        self.pool = ThreadPoolExecutor(
+            max_workers=max(1, workers),
+            thread_name_prefix="snapshot"
+        )
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.sequence = itertools.count()
+
+    def submit(self, frame, name, stamp):
+        # stamp is when the frame was captured, not when it was requested
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return None
+            self.pending += 1
+            seq = next(self.sequence)
+
+        return self.pool.submit(self._write, frame, name, stamp, seq)
+
+    def filename(self, name, stamp, seq):
+        # seq keeps two slots showing the same feed from colliding
+        safe = re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_") or "stream"
+        ts = time.strftime("%Y%m%d-%H%M%S", time.localtime(stamp))
+        ms = int(stamp * 1000) % 1000
+        return os.path.join(
+            self.directory,
+            f"{safe}_{ts}-{ms:03d}_{seq:05d}.{self.fmt}"
+        )
+
+    def shutdown(self, wait=False):
+        self.pool.shutdown(wait=wait)
+
+    def _write(self, frame, name, stamp, seq):
+        path = self.filename(name, stamp, seq)
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+
+            # PyAV frames are converted here, not on the video worker
+            if av is not None and isinstance(frame, av.VideoFrame):
+                frame = frame.to_ndarray(format="bgr24")
+
+            if not cv2.imwrite(path, frame, self.params):
+                raise OSError("could not encode or write image")
+
+            with self.lock:
+                self.written += 1
+            return path
+        except Exception as e:
+            print(f"Snapshot failed: {path}: {e}")
+            with self.lock:
+                self.failed += 1
+            return None
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+
 class RTSPViewer:
     # ---------------------------------------------------------
     # INITIALIZATION
@@ -35,6 +418,7 @@ class RTSPViewer:
         self.slot_map = {}
         self.slot_labels = []
         self.hotkey_map = {}
+        self.feed_options = {}
 
         self.maintain_aspect = False
         self.fullscreen = False
@@ -43,8 +427,34 @@ class RTSPViewer:
         # Fullscreen banner text (loaded from config)
         self.fullscreen_text = "rtsp-viewer"
 
+        # ---------------- Tour State ----------------
+        self.tour_config = {}
+        self.tour_groups = []
+        self.tour_index = 0
+        self.tour_active = False
+        self.tour_jobs = []
+
+        # ---------------- Snapshot State ----------------
+        self.snapshot_config = {}
+        self.latest_frames = {}
+        self.feed_names = {}
+
         self.feeds = self.load_config()
         self.setup_ui()
+        self.load_tour()
+
+        self.prefetcher = StreamPrefetcher(
+            self.connect_feed,
+            max_connections=self.tour_config.get("max_prefetch_connections", 2)
+        )
+
+        self.snapshots = SnapshotWriter(
+            directory=self.snapshot_config.get("directory", "snapshots"),
+            fmt=self.snapshot_config.get("format", "jpg"),
+            quality=self.snapshot_config.get("jpeg_quality", 90),
+            workers=self.snapshot_config.get("workers", 2),
+            max_pending=self.snapshot_config.get("max_pending", 8)
+        )
 
         # ---------------- Background Worker ----------------
         self.worker_thread = threading.Thread(
@@ -57,6 +467,12 @@ class RTSPViewer:
         self.root.bind_all("<Key>", self.universal_key_handler)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        if self.tour_config.get("enabled"):
+            self.root.after(500, self.start_tour)
+
+        if self.snapshot_config.get("interval", 0) > 0:
+            self.schedule_snapshot()
+
     # ---------------------------------------------------------
     # UI SETUP
     # ---------------------------------------------------------
@@ -164,6 +580,9 @@ class RTSPViewer:
             if hk:
                 self.hotkey_map[str(hk)] = url
 
+            self.feed_names[url] = name
+            self.feed_options[url] = feed
+
             row = tk.Label(
                 self.scrollable_frame,
                 text=name,
@@ -272,11 +691,140 @@ class RTSPViewer:
             )
 
     def assign_stream_to_slot(self, url):
+        # Manual selection takes over from a running tour
+        if self.tour_active:
+            self.stop_tour()
+
         self.slot_map[self.selected_slot] = url
         self.request_queue.put(("UPDATE", dict(self.slot_map)))
         self.selected_slot = (self.selected_slot + 1) % self.grid_mode
         self.update_highlight()
 
+    # ---------------------------------------------------------
+    # TOUR MODE
+    # ---------------------------------------------------------
+    def load_tour(self):
+        # Groups list feed names (or raw urls) to rotate through the grid
+        names = {f.get("name"): f.get("url") for f in self.feeds}
+        self.tour_groups = []
+
+        for group in self.tour_config.get("groups", []):
+            urls = []
+            for entry in group:
+                if entry in names:
+                    urls.append(names[entry])
+                elif "://" in str(entry):
+                    urls.append(entry)
+                else:
+                    print(f"Tour: no feed named '{entry}', skipping")
+
+            if urls:
+                self.tour_groups.append(urls)
+
+    def toggle_tour(self):
+        if self.tour_active:
+            self.stop_tour()
+        else:
+            self.start_tour()
+
+    def start_tour(self):
+        if not self.tour_groups:
+            return
+
+        self.stop_tour()
+        self.tour_active = True
+        self.tour_index = 0
+
+        grid = self.tour_config.get("grid", 4)
+        if grid != self.grid_mode:
+            self.set_grid_mode(grid)
+
+        self.tour_step()
+
+    def stop_tour(self):
+        self.tour_active = False
+
+        for job in self.tour_jobs:
+            self.root.after_cancel(job)
+        self.tour_jobs = []
+
+        self.prefetcher.stop_all()
+
+    def tour_step(self):
+        interval = self.tour_config.get("interval", 20)
+        lead = self.tour_config.get("prefetch_seconds", 4)
+
+        self.show_group(self.tour_groups[self.tour_index])
+        self.tour_index = (self.tour_index + 1) % len(self.tour_groups)
+
+        # Warm up the next group shortly before its turn
+        upcoming = self.tour_groups[self.tour_index]
+        self.tour_jobs = [
+            self.root.after(
+                int(max(0, interval - lead) * 1000),
+                self.prefetch_group,
+                upcoming
+            ),
+            self.root.after(int(interval * 1000), self.tour_step),
+        ]
+
+    def prefetch_group(self, group):
+        on_screen = set(self.slot_map.values())
+        self.prefetcher.prefetch(
+            [url for url in group[:self.grid_mode] if url not in on_screen]
+        )
+
+    def show_group(self, group):
+        self.slot_map = dict(enumerate(group[:self.grid_mode]))
+
+        # Blank slots the group does not fill
+        for i, lbl in enumerate(self.slot_labels):
+            if i not in self.slot_map:
+                lbl.config(image="")
+                lbl.image = None
+
+        self.request_queue.put(("UPDATE", dict(self.slot_map)))
+
+    # ---------------------------------------------------------
+    # SNAPSHOTS
+    # ---------------------------------------------------------
+    def take_snapshot(self, all_slots=False):
+        slots = range(self.grid_mode) if all_slots else [self.selected_slot]
+        seen = set()
+
+        for idx in slots:
+            latest = self.latest_frames.get(idx)
+            if latest is None:
+                continue
+
+            # A feed shown in several slots is written once per frame
+            url, frame, stamp = latest
+            if (url, stamp) in seen:
+                continue
+            seen.add((url, stamp))
+
+            self.snapshots.submit(frame, self.feed_names.get(url, url), stamp)
+
+    def schedule_snapshot(self):
+        if not self.is_running:
+            return
+
+        self.take_snapshot(self.snapshot_config.get("scope", "all") == "all")
+        self.root.after(
+            int(self.snapshot_config["interval"] * 1000),
+            self.schedule_snapshot
+        )
+
+    # ---------------------------------------------------------
+    # CAPTURE BACKENDS
+    # ---------------------------------------------------------
+    def connect_feed(self, url):
+        return open_capture(url, self.feed_options.get(url))
+
+    def open_feed(self, url):
+        # Connects on its own thread so the video worker never waits
+        return ThreadedCapture(self.connect_feed, url)
+
     # ---------------------------------------------------------
     # VIDEO WORKER THREAD (OPTIMIZED FOR RPI)
     # ---------------------------------------------------------
@@ -298,14 +846,17 @@ class RTSPViewer:
                         cap.release()
                     caps.clear()
                     active_map.clear()
+                    self.latest_frames.clear()
 
                 elif cmd == "UPDATE":
                     active_map = data
 
+                    # Prefetched streams publish their decoded frame on the next read
                     for url in active_map.values():
                         if url and url not in caps:
-                            cap = cv2.VideoCapture(url)
-                            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                            cap = self.prefetcher.claim(url)
+                            if cap is None:
+                                cap = self.open_feed(url)
                             caps[url] = cap
 
                     for url in list(caps.keys()):
@@ -313,49 +864,89 @@ class RTSPViewer:
                             caps[url].release()
                             del caps[url]
 
+                    for idx in list(self.latest_frames):
+                        if idx not in active_map:
+                            del self.latest_frames[idx]
+
             except queue.Empty:
                 pass
 
             # ---------- Read Frames ----------
             now = time.time()
 
-            for idx, url in list(active_map.items()):
-
-                cap = caps.get(url)
-                if not cap or not cap.isOpened():
-                    continue
+            for url, cap in list(caps.items()):
 
                 if now - last_frame_time.get(url, 0) < target_interval:
                     continue
 
-                ret, frame = cap.read()
-                if not ret:
-                    cap.release()
-                    caps[url] = cv2.VideoCapture(url)
+                # Reconnects are handled by the capture's reader thread
+                frame, stamp = cap.next_frame()
+                if frame is None:
+                    # A dropped feed must not keep feeding old frames to snapshots
+                    if not cap.connected:
+                        for idx, slot_url in active_map.items():
+                            if slot_url == url:
+                                self.latest_frames.pop(idx, None)
                     continue
 
                 last_frame_time[url] = now
 
-                lbl = self.slot_labels[idx]
-                w = lbl.winfo_width()
-                h = lbl.winfo_height()
+                for idx, slot_url in active_map.items():
+                    if slot_url == url:
+                        # Keep the full-res frame for snapshots (no copy)
+                        self.latest_frames[idx] = (url, frame, stamp)
+                        self.render_frame(idx, frame)
 
-                if w < 10 or h < 10:
-                    continue
+            time.sleep(0.01)
 
-                # Convert color ONCE (performance critical)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                img = Image.fromarray(frame)
+    def render_frame(self, idx, frame):
+        if idx >= len(self.slot_labels):
+            return
 
-                if self.maintain_aspect:
-                    img = self.letterbox(img, w, h)
-                else:
-                    img = img.resize((w, h), Image.Resampling.BILINEAR)
+        lbl = self.slot_labels[idx]
+        w = lbl.winfo_width()
+        h = lbl.winfo_height()
 
-                tk_img = ImageTk.PhotoImage(img)
-                self.root.after(0, self.safe_update, idx, tk_img)
+        if w < 10 or h < 10:
+            return
 
-            time.sleep(0.01)
+        tk_img = ImageTk.PhotoImage(self.frame_to_image(frame, w, h))
+        self.root.after(0, self.safe_update, idx, tk_img)
+
+    def frame_to_image(self, frame, w, h):
+        if av is not None and isinstance(frame, av.VideoFrame):
+            return self.av_frame_to_image(frame, w, h)
+
+        # Convert color ONCE (performance critical)
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        img = Image.fromarray(frame)
+
+        if self.maintain_aspect:
+            return self.letterbox(img, w, h)
+        return img.resize((w, h), Image.Resampling.BILINEAR)
+
+    def av_frame_to_image(self, frame, w, h):
+        # libswscale scales and converts to rgb24 in a single pass
+        if not self.maintain_aspect:
+            return frame.reformat(
+                width=w,
+                height=h,
+                format="rgb24",
+                interpolation="BILINEAR"
+            ).to_image()
+
+        ratio = min(w / frame.width, h / frame.height)
+        nw = max(1, int(frame.width * ratio))
+        nh = max(1, int(frame.height * ratio))
+
+        img = frame.reformat(
+            width=nw,
+            height=nh,
+            format="rgb24",
+            interpolation="BILINEAR"
+        ).to_image()
+
+        return self.center_on_black(img, w, h)
 
     # ---------------------------------------------------------
     # SAFE UI UPDATE
@@ -378,8 +969,13 @@ class RTSPViewer:
 
         img = img.resize((nw, nh), Image.Resampling.BILINEAR)
 
+        return self.center_on_black(img, tw, th)
+
+    def center_on_black(self, img, tw, th):
+        sw, sh = img.size
+
         background = Image.new("RGB", (tw, th), (0, 0, 0))
-        background.paste(img, ((tw - nw) // 2, (th - nh) // 2))
+        background.paste(img, ((tw - sw) // 2, (th - sh) // 2))
 
         return background
 
@@ -396,6 +992,12 @@ class RTSPViewer:
             self.toggle_fullscreen()
         elif key in ["a", "A"]:
             self.toggle_aspect_mode()
+        elif key == "s":
+            self.take_snapshot()
+        elif key == "S":
+            self.take_snapshot(all_slots=True)
+        elif key in ["t", "T"]:
+            self.toggle_tour()
         elif key == "Escape":
             self.exit_fullscreen()
         elif key in self.hotkey_map:
@@ -430,6 +1032,8 @@ class RTSPViewer:
             with open("config.json", "r") as f:
                 data = json.load(f)
                 self.fullscreen_text = data.get("fullscreen_text", "rtsp-viewer")
+                self.tour_config = data.get("tour", {})
+                self.snapshot_config = data.get("snapshots", {})
                 return data.get("feeds", [])
         except Exception:
             self.fullscreen_text = "rtsp-viewer"
@@ -440,6 +1044,8 @@ class RTSPViewer:
     # ---------------------------------------------------------
     def on_closing(self):
         self.is_running = False
+        self.stop_tour()
+        self.snapshots.shutdown()
         self.root.destroy()
 
 